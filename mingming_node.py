@@ -14,10 +14,18 @@ Simple 3-node workflow for LoRA creation
 """
 
 import os
+import sys
 import json
 import math
+import time
+import uuid
 import datetime
 import re
+import stat
+import shutil
+import hashlib
+import subprocess
+import threading
 import numpy as np
 from PIL import Image, ImageOps, ImageDraw, ImageFont
 import folder_paths
@@ -54,6 +62,63 @@ def _expand_path(path: str) -> str:
         return ""
     return os.path.expanduser(os.path.expandvars(path))
 
+def _frame_store_root() -> str:
+    """중복 제거용 콘텐츠 주소 저장소 (data/_frame_store)"""
+    root = os.path.join(_pkg_data_root(), "_frame_store")
+    _ensure_dir(root)
+    return root
+
+def _save_frame_dedup(img: Image.Image, dst: str) -> str:
+    """
+    픽셀 해시로 저장소에 한 번만 PNG를 저장하고 dst에는 하드링크(실패 시 복사).
+    반환값: "linked" / "copied" / "unchanged"
+    """
+    digest = hashlib.sha256(f"{img.mode}{img.size}".encode() + img.tobytes()).hexdigest()
+    blob_dir = os.path.join(_frame_store_root(), digest[:2])
+    blob = os.path.join(blob_dir, f"{digest}.png")
+    if not os.path.exists(blob):
+        _ensure_dir(blob_dir)
+        tmp = f"{blob}.{uuid.uuid4().hex[:6]}.tmp"
+        img.save(tmp, format='PNG')
+        os.replace(tmp, blob)
+    # 저장소 blob은 읽기 전용 → 링크를 통해 내용이 덮어써지지 않도록
+    os.chmod(blob, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+    return _link_or_copy(blob, dst)
+
+def _remove_file(path: str):
+    """파일 삭제 - 읽기 전용(저장소 하드링크)이라 Windows에서 거부되면 권한을 풀고 재시도"""
+    try:
+        os.remove(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+        os.remove(path)
+
+def _save_image_replace(img: Image.Image, dst: str):
+    """
+    임시 파일에 저장 후 dst를 교체 - dst가 저장소 blob의 하드링크여도
+    링크만 끊기고 blob과 다른 데이터셋 파일은 그대로 유지
+    """
+    tmp = f"{dst}.{uuid.uuid4().hex[:6]}.tmp"
+    img.save(tmp, format='PNG')
+    try:
+        os.replace(tmp, dst)
+    except PermissionError:
+        _remove_file(dst)
+        os.replace(tmp, dst)
+
+def _link_or_copy(src: str, dst: str) -> str:
+    """dst를 src의 하드링크로 만들고 실패하면 복사. 반환값: linked / copied / unchanged"""
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return "unchanged"
+        _remove_file(dst)
+    try:
+        os.link(src, dst)
+        return "linked"
+    except OSError:  # 다른 볼륨 / 하드링크 미지원 파일시스템
+        shutil.copyfile(src, dst)  # 읽기 전용 권한은 복사하지 않음
+        return "copied"
+
 # ---------- 💖 INPUT NODE ----------
 
 class MingmingInputNode:
@@ -96,6 +161,8 @@ class MingmingInputNode:
             "optional": {
                 "input_image": ("IMAGE",),
                 "video_path": ("STRING", {"default": ""}),
+                # 0 = 첫 프레임만 사용, N > 0 = 영상을 N개 시간(각도) 구간으로 나눠 구간별 베스트 프레임 선택
+                "video_frame_bins": ("INT", {"default": 0, "min": 0, "max": 72}),
             }
         }
 
@@ -105,6 +172,11 @@ class MingmingInputNode:
     CATEGORY = "💖 Mingming LoRA"
     OUTPUT_NODE = False
 
+    VIDEO_EXTS = ('.mp4', '.avi', '.mov')
+    SCAN_SIZE = 256        # 점수 계산용 그레이스케일 긴 변 길이
+    SCAN_CHUNK = 32        # 한 번에 점수를 매기는 프레임 수 (메모리 상한)
+    DUP_THRESHOLD = 0.5    # 이전 프레임과 평균 밝기 차이가 이보다 작으면 반복 프레임
+
     @classmethod
     def IS_CHANGED(cls, **kwargs):
         return float("nan")  # 항상 변경된 것으로 처리하여 미리보기 업데이트
@@ -123,6 +195,7 @@ class MingmingInputNode:
         source_file = kwargs.get("💝_소스_파일")
         input_image = kwargs.get("input_image")
         video_path = kwargs.get("video_path", "")
+        video_bins = kwargs.get("video_frame_bins", 0)
 
         # 데이터셋 경로 설정
         if data_path == "AUTO" or not data_path.strip():
@@ -133,7 +206,7 @@ class MingmingInputNode:
 
         # 소스 이미지 처리
         source_image = self._process_source_image(
-            source_type, source_file, input_image, video_path, lora_name, trigger_word
+            source_type, source_file, input_image, video_path, lora_name, trigger_word, video_bins
         )
 
         print(f"💖 Mingming Input processed: {lora_name} | {trigger_word} | {style}")
@@ -143,8 +216,14 @@ class MingmingInputNode:
             "result": (source_image,)
         }
 
-    def _process_source_image(self, source_type, source_file, input_image, video_path, lora_name, trigger_word):
+    def _process_source_image(self, source_type, source_file, input_image, video_path, lora_name, trigger_word, video_bins=0):
         """소스 이미지 처리 로직"""
+        # 업로드된 파일이 영상이면 비디오 경로로 사용
+        if source_file and source_file.lower().endswith(self.VIDEO_EXTS):
+            if source_type == "video_frames" and not video_path:
+                video_path = os.path.join(folder_paths.get_input_directory(), source_file)
+            source_file = None
+
         # 2. 파일 업로드 처리
         if source_file and source_file != "<no_files>":
             try:
@@ -164,7 +243,19 @@ class MingmingInputNode:
         if input_image is not None:
             return input_image
 
-        # 3. 비디오 파일 처리 (첫 프레임 추출)
+        # 3. 비디오 파일 처리 (구간별 베스트 프레임 또는 첫 프레임 추출)
+        if source_type == "video_frames" and video_path and video_bins > 0:
+            try:
+                selected = self._select_video_frames(video_path, video_bins)
+                if selected is not None:
+                    return selected
+            except ImportError:
+                # 첫 프레임 추출도 OpenCV가 필요하므로 바로 더미 이미지로
+                print("💖 OpenCV not available for video processing")
+                return self._create_dummy_image(lora_name, trigger_word)
+            except Exception as e:
+                print(f"💖 프레임 선택 실패: {e}")
+
         if source_type == "video_frames" and video_path:
             try:
                 import cv2
@@ -184,6 +275,73 @@ class MingmingInputNode:
         # 4. 기본 더미 이미지 생성
         return self._create_dummy_image(lora_name, trigger_word)
 
+    def _score_frames(self, grays, prev_gray):
+        """
+        다운샘플 그레이스케일 배치 (K, h, w) 점수 계산 - 전부 배치 numpy 연산
+          sharpness: 라플라시안 분산 (흔들림/모션 블러일수록 낮음)
+          diff: 이전 프레임과의 평균 절대 차이 (반복 프레임이면 ~0)
+        """
+        g = grays.astype(np.float32)
+        lap = (g[:, 1:-1, :-2] + g[:, 1:-1, 2:] + g[:, :-2, 1:-1] + g[:, 2:, 1:-1]
+               - 4.0 * g[:, 1:-1, 1:-1])
+        sharpness = lap.var(axis=(1, 2))
+        if prev_gray is None:
+            diff = np.concatenate([[np.inf], np.abs(np.diff(g, axis=0)).mean(axis=(1, 2))])
+        else:
+            diff = np.abs(np.diff(np.concatenate([prev_gray[None].astype(np.float32), g]), axis=0)).mean(axis=(1, 2))
+        score = np.log1p(sharpness)
+        score[diff < self.DUP_THRESHOLD] -= 1e6  # 반복 프레임은 구간에 다른 후보가 없을 때만 선택
+        return score, sharpness, diff
+
+    def _select_video_frames(self, video_path, bins):
+        """
+        영상을 한 번만 디코딩하면서 SCAN_CHUNK 단위로 점수를 매기고
+        시간(=턴테이블 각도) 구간마다 최고 점수 프레임만 원본 해상도로 보관
+        """
+        import cv2
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return None
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        best_scores = np.full(bins, -np.inf)
+        best_frames = [None] * bins
+        prev_gray, idx, done = None, 0, False
+        try:
+            while not done:
+                chunk, grays = [], []
+                while len(chunk) < self.SCAN_CHUNK:
+                    ret, frame = cap.read()
+                    if not ret:
+                        done = True
+                        break
+                    h, w = frame.shape[:2]
+                    scale = self.SCAN_SIZE / max(h, w)
+                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                    if scale < 1.0:
+                        gray = cv2.resize(gray, (max(3, int(w * scale)), max(3, int(h * scale))), interpolation=cv2.INTER_AREA)
+                    chunk.append(frame)
+                    grays.append(gray)
+                if not chunk:
+                    break
+                scores, _, _ = self._score_frames(np.stack(grays), prev_gray)
+                # 전체 길이를 모르면 SCAN_CHUNK 프레임을 한 구간으로 취급
+                ids = np.arange(idx, idx + len(chunk))
+                bin_ids = np.minimum(ids * bins // total, bins - 1) if total > 0 else np.minimum(ids // self.SCAN_CHUNK, bins - 1)
+                for k in np.flatnonzero(scores > best_scores[bin_ids]):
+                    b = bin_ids[k]
+                    if scores[k] > best_scores[b]:
+                        best_scores[b] = scores[k]
+                        best_frames[b] = cv2.cvtColor(chunk[k], cv2.COLOR_BGR2RGB)
+                prev_gray = grays[-1]
+                idx += len(chunk)
+        finally:
+            cap.release()
+        picked = [f for f in best_frames if f is not None]
+        if not picked:
+            return None
+        print(f"💖 Frame selection: {len(picked)}/{bins} bins from {idx} decoded frames")
+        return np.stack(picked).astype(np.float32) / 255.0
+
     def _create_dummy_image(self, lora_name, trigger_word):
         """더미 이미지 생성"""
         img = Image.new('RGB', (512, 512), color=(200, 220, 255))
@@ -225,6 +383,73 @@ class MingmingInputNode:
             print(f"💖 Preview generation failed: {e}")
         return []
 
+# ---------- 🎞️ TURNTABLE EXPORT ----------
+
+class _TurntableWriter:
+    """
+    360° 프레임을 생성되는 즉시 애니메이션으로 기록
+    • mp4: OpenCV VideoWriter로 원본 해상도 그대로 스트리밍 (프레임을 보관하지 않음)
+    • webp/gif: PIL 인코더가 전체 프레임 목록을 요구하므로 PREVIEW_SIZE 이하 썸네일만 보관
+      (gif는 팔레트 1바이트/픽셀) → frames_batch 크기와 무관하게 메모리 상한 유지
+    OpenCV가 없거나 mp4 인코더를 열 수 없으면 mp4 요청은 webp로 대체
+    """
+    PREVIEW_SIZE = 384
+
+    def __init__(self, path_stem: str, fmt: str, fps: int = 12):
+        self.fmt = fmt
+        self.path_stem = path_stem
+        self.fps = max(1, int(fps))
+        self.count = 0
+        self._frames = []
+        self._video = None
+        if fmt == "mp4":
+            try:
+                import cv2  # noqa: F401
+            except ImportError:
+                print("🎞️ OpenCV not available, turntable export falls back to webp")
+                self.fmt = "webp"
+        self.path = f"{path_stem}.{self.fmt}"
+
+    def _open_video(self, size):
+        import cv2
+        video = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, size)
+        if video.isOpened():
+            self._video = video
+            return
+        video.release()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        print("🎞️ mp4v encoder not available, turntable export falls back to webp")
+        self.fmt = "webp"
+        self.path = f"{self.path_stem}.webp"
+
+    def add(self, frame_img: Image.Image):
+        if self.fmt == "mp4" and self._video is None:
+            self._open_video(frame_img.size)
+        if self.fmt == "mp4":
+            import cv2
+            self._video.write(cv2.cvtColor(np.asarray(frame_img.convert('RGB')), cv2.COLOR_RGB2BGR))
+        else:
+            thumb = frame_img.convert('RGB')
+            thumb.thumbnail((self.PREVIEW_SIZE, self.PREVIEW_SIZE), Image.LANCZOS)
+            if self.fmt == "gif":
+                thumb = thumb.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+            self._frames.append(thumb)
+        self.count += 1
+
+    def close(self) -> str:
+        """파일을 마무리하고 경로 반환 (프레임이 없으면 빈 문자열)"""
+        if self.fmt == "mp4":
+            if self._video is not None:
+                self._video.release()
+                self._video = None
+        elif self._frames:
+            first, rest = self._frames[0], self._frames[1:]
+            kwargs = {"lossless": False, "quality": 80} if self.fmt == "webp" else {"optimize": False, "disposal": 1}
+            first.save(self.path, save_all=True, append_images=rest, duration=int(1000 / self.fps), loop=0, **kwargs)
+            self._frames = []
+        return self.path if self.count else ""
+
 # ---------- 💙 360° PREVIEW NODE (완 + CLIP + 부정프롬프트 + KSampler I/O) ----------
 
 class Mingming360PreviewNode:
@@ -284,6 +509,13 @@ class Mingming360PreviewNode:
                 "🧪_cfg": ("FLOAT", {"default": 6.0, "min": 0.1, "max": 20.0}),
                 "🧪_sampler": (["euler","euler_ancestral","uni_pc","dpmpp_2m"], {"default": "uni_pc"}),
                 "🧪_scheduler": (["simple","karras","sgm_uniform"], {"default": "simple"}),
+            },
+            "optional": {
+                # direct: 프레임마다 PNG 저장 / dedup_hardlink: data/_frame_store에 한 번 저장 후 하드링크
+                "dataset_store": (["direct", "dedup_hardlink"], {"default": "direct"}),
+                # 회전 애니메이션 내보내기 (데이터셋 폴더에 저장 + 프리뷰)
+                "turntable_export": (["off", "webp", "gif", "mp4"], {"default": "off"}),
+                "turntable_fps": ("INT", {"default": 12, "min": 1, "max": 60}),
             }
         }
 
@@ -312,6 +544,9 @@ class Mingming360PreviewNode:
         auto_save = kwargs.get("🧡_자동_저장", True)
         show_grid = kwargs.get("💘_그리드_프리뷰", True)
         random_angles = kwargs.get("🤍_각도_랜덤", False)
+        dataset_store = kwargs.get("dataset_store", "direct")
+        turntable_export = kwargs.get("turntable_export", "off")
+        turntable_fps = kwargs.get("turntable_fps", 12)
 
         # WAN 연결 I/O 값
         pos_prompt = kwargs.get("🟢_프롬프트","")
@@ -340,20 +575,43 @@ class Mingming360PreviewNode:
 
         # 소스 이미지
         source_array = source_image.cpu().numpy() if hasattr(source_image, 'cpu') else source_image
-        base_img = Image.fromarray((np.clip(source_array[0] * 255.0, 0, 255)).astype(np.uint8))
+        # 소스가 여러 장(턴테이블 영상 선택 프레임)이면 각도에 맞는 프레임 사용
+        source_imgs = {}
 
         # 360도 프레임 생성
         frames, saved_files = [], []
+        store_stats = {}
+        turntable = None
+        if turntable_export != "off":
+            # 학습 스크립트가 데이터셋 폴더의 이미지(.webp 포함)를 학습 샘플로 읽으므로 하위 폴더에 저장
+            preview_dir = os.path.join(dataset_path, "_preview")
+            _ensure_dir(preview_dir)
+            turntable = _TurntableWriter(os.path.join(preview_dir, f"{lora_name}_turntable"), turntable_export, turntable_fps)
         print(f"💙 Generating {frame_count} frames for 360° preview...")
         for i, angle in enumerate(angles):
+            src_idx = int(round(angle / 360.0 * len(source_array))) % len(source_array)
+            if src_idx not in source_imgs:
+                source_imgs[src_idx] = Image.fromarray((np.clip(source_array[src_idx] * 255.0, 0, 255)).astype(np.uint8))
+            base_img = source_imgs[src_idx]
             frame_img = self._generate_angle_frame(base_img, angle, w, h, lora_name, trigger_word, quality)
             frame_array = np.array(frame_img).astype(np.float32) / 255.0
             frames.append(frame_array)
+            if turntable is not None:
+                try:
+                    turntable.add(frame_img)
+                except Exception as e:
+                    # 애니메이션 실패가 데이터셋 저장을 막지 않도록 내보내기만 중단
+                    print(f"🎞️ Turntable export failed, skipping: {e}")
+                    turntable = None
 
             if auto_save:
                 img_filename = f"{lora_name}_{i+1:03d}.png"
                 img_path = os.path.join(dataset_path, img_filename)
-                frame_img.save(img_path)
+                if dataset_store == "dedup_hardlink":
+                    result = _save_frame_dedup(frame_img, img_path)
+                    store_stats[result] = store_stats.get(result, 0) + 1
+                else:
+                    _save_image_replace(frame_img, img_path)
                 caption = self._generate_caption(trigger_word, lora_name, style, quality_tags, angle, i)
                 txt_filename = f"{lora_name}_{i+1:03d}.txt"
                 txt_path = os.path.join(dataset_path, txt_filename)
@@ -366,6 +624,14 @@ class Mingming360PreviewNode:
 
         frames_batch = np.stack(frames, axis=0)
 
+        turntable_path = ""
+        if turntable is not None:
+            try:
+                turntable_path = turntable.close()
+                print(f"🎞️ Turntable exported: {turntable_path}")
+            except Exception as e:
+                print(f"🎞️ Turntable export failed: {e}")
+
         # 프리뷰 그리드
         if show_grid and len(frames) > 1:
             preview_grid = self._create_preview_grid(frames, frame_count)
@@ -383,10 +649,13 @@ class Mingming360PreviewNode:
 💜 Quality: {quality}
 💝 Auto Save: {'ON' if auto_save else 'OFF'}
 💕 Dataset Path: {dataset_path}
+💾 Dataset Store: {dataset_store}{" (" + ", ".join(f"{k}={v}" for k, v in sorted(store_stats.items())) + ")" if store_stats else ""}
 
 🧪 Sampler:
   seed={seed}, steps={steps}, cfg={cfg}, sampler={sampler}, scheduler={scheduler}
 
+🎞️ Turntable: {turntable_path or 'OFF'}
+
 🧡 Generated Files: {len(saved_files)} pairs
 {"📁 " + chr(10).join(saved_files[:5]) if saved_files else ""}
 {"..." if len(saved_files) > 5 else ""}"""
@@ -394,7 +663,7 @@ class Mingming360PreviewNode:
         print(f"💙 360° preview generation completed: {frame_count} frames")
 
         return {
-            "ui": {"images": self._get_360_preview_images(frames_batch, preview_grid_batch, frame_count)},
+            "ui": {"images": self._get_360_preview_images(frames_batch, preview_grid_batch, frame_count, turntable_path)},
             "result": (frames_batch, generation_info, pos_prompt, neg_prompt, seed, steps, cfg, sampler, scheduler)
         }
 
@@ -490,8 +759,23 @@ class Mingming360PreviewNode:
             grid_img.paste(thumb, (x, y))
         return grid_img
 
-    def _get_360_preview_images(self, frames_batch, preview_grid_batch, frame_count):
+    def _get_360_preview_images(self, frames_batch, preview_grid_batch, frame_count, turntable_path=""):
         preview_images = []
+        # 애니메이션 webp/gif는 temp 폴더에 링크해 첫 번째 프리뷰로 표시 (mp4는 경로만 안내)
+        if turntable_path and not turntable_path.endswith(".mp4"):
+            try:
+                temp_dir = folder_paths.get_temp_directory()
+                _ensure_dir(temp_dir)
+                temp_name = f"mingming_{os.path.basename(turntable_path)}"
+                _link_or_copy(turntable_path, os.path.join(temp_dir, temp_name))
+                preview_images.append({
+                    "filename": temp_name,
+                    "subfolder": "",
+                    "type": "temp",
+                    "format": os.path.splitext(temp_name)[1][1:].upper(),
+                })
+            except Exception as e:
+                print(f"🎞️ Turntable preview failed: {e}")
         try:
             if preview_grid_batch is not None:
                 grid_array = preview_grid_batch.cpu().numpy() if hasattr(preview_grid_batch, 'cpu') else preview_grid_batch
@@ -520,6 +804,417 @@ class Mingming360PreviewNode:
             print(f"💙 360° preview generation failed: {e}")
         return preview_images
 
+# ---------- 🚀 TRAINING JOB SCHEDULER ----------
+
+def _job_events(job: dict, offset: int = 0):
+    """
+    작업 자신의 이벤트만 반환: 작업 시작 시 기록한 events_offset 이후 + job_id 태그 일치.
+    (events.jsonl은 수동 실행/이전 작업과 공유되는 append 로그)
+    시작 전이거나 events_offset이 없는 작업은 빈 목록.
+    """
+    if "events_offset" not in job:
+        return [], offset
+    path = job.get("events") or os.path.join(job["cwd"], "events.jsonl")
+    events, next_offset = _tail_jsonl(path, max(offset, job["events_offset"]))
+    return [ev for ev in events if ev.get("job_id") == job["id"]], next_offset
+
+def _tail_jsonl(path: str, offset: int = 0, max_bytes: int = 1 << 20):
+    """
+    offset 바이트부터 JSONL 이벤트를 읽어 (events, new_offset) 반환.
+    아직 쓰는 중인 마지막 줄(개행 없음)은 다음 호출에서 다시 읽도록 남겨둠.
+    max_bytes보다 긴 줄은 건너뜀 (오프셋이 멈추지 않도록).
+    """
+    if not path or not os.path.exists(path):
+        return [], 0
+    if os.path.getsize(path) < offset:  # 파일이 새로 만들어짐
+        offset = 0
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        chunk = f.read(max_bytes)
+        if len(chunk) == max_bytes and b"\n" not in chunk:
+            # 너무 긴 줄: 다음 개행까지 건너뛰기 (아직 쓰는 중이면 그대로 대기)
+            skipped = len(chunk)
+            while True:
+                block = f.read(max_bytes)
+                if not block:
+                    return [], offset
+                nl = block.find(b"\n")
+                if nl >= 0:
+                    print(f"📡 Skipped oversized event line ({skipped + nl + 1} bytes) in {path}")
+                    return [], offset + skipped + nl + 1
+                skipped += len(block)
+    end = chunk.rfind(b"\n") + 1
+    events = []
+    for line in chunk[:end].splitlines():
+        try:
+            events.append(json.loads(line.decode('utf-8')))
+        except ValueError:
+            continue
+    return events, offset + end
+
+def _pid_alive(pid, script: str = ""):
+    """
+    pid가 여전히 해당 학습 스크립트를 실행 중인지 확인.
+    True / False, 판단 불가(psutil 없는 Windows)면 None
+    """
+    if not pid:
+        return False
+    try:
+        import psutil
+        try:
+            proc = psutil.Process(pid)
+            if proc.status() == psutil.STATUS_ZOMBIE:
+                return False
+            return not script or any(script in arg for arg in proc.cmdline())
+        except psutil.NoSuchProcess:
+            return False
+        except psutil.AccessDenied:
+            return True
+    except ImportError:
+        pass
+    if os.name == "nt":
+        return None  # os.kill(pid, 0)은 Windows에서 CTRL_C_EVENT 전송
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    proc_dir = f"/proc/{pid}"
+    if os.path.isdir(proc_dir):
+        try:
+            with open(os.path.join(proc_dir, "stat"), 'rb') as f:
+                if f.read().rsplit(b")", 1)[-1].split()[0] == b"Z":  # 좀비
+                    return False
+            with open(os.path.join(proc_dir, "cmdline"), 'rb') as f:
+                cmdline = f.read()
+            # 다른 프로그램이 pid를 재사용한 경우 걸러냄 (exec 직후엔 cmdline이 비어 있을 수 있음)
+            if script and cmdline and script.encode() not in cmdline:
+                return False
+        except OSError:
+            return False
+    return True
+
+class _AdoptedProcess:
+    """ComfyUI 재시작 전에 시작되어 아직 살아있는 학습 프로세스 - Popen 대신 pid로 추적"""
+    def __init__(self, pid: int, script: str):
+        self.pid = pid
+        self.script = script
+
+    def poll(self):
+        # 자식 프로세스가 아니라 종료 코드를 알 수 없음 → 결과는 이벤트 로그로 판단
+        return None if _pid_alive(self.pid, self.script) else 0
+
+    def _signal(self, force: bool):
+        try:
+            import psutil
+            proc = psutil.Process(self.pid)
+            proc.kill() if force else proc.terminate()
+        except ImportError:
+            import signal
+            os.kill(self.pid, getattr(signal, "SIGKILL", signal.SIGTERM) if force else signal.SIGTERM)
+
+    def terminate(self):
+        self._signal(False)
+
+    def kill(self):
+        self._signal(True)
+
+class _TrainingScheduler:
+    """
+    로컬 학습 작업 큐 - 생성된 학습 스크립트를 서브프로세스로 실행
+    • submit(): 큐에 추가 후 즉시 반환 (ComfyUI 실행기를 막지 않음)
+    • 감독 스레드가 max_concurrent 개까지 동시에 실행 (같은 output_dir 작업은 한 번에 하나)
+    • 작업마다 학습 스크립트/설정 사본(jobs/)을 실행 → 큐에 넣은 시점의 설정 유지
+    • 큐 상태는 data/lora_outputs/_job_queue.json 에 저장 → 재시작 후에도 이어서 실행
+      (재시작 시 아직 살아있는 프로세스는 pid로 계속 추적, 죽은 작업만 다시 대기열로)
+    • cancel(): 대기 중이면 취소, 실행 중이면 프로세스 종료
+    """
+    POLL_INTERVAL = 1.0
+    KILL_TIMEOUT = 10.0
+
+    def __init__(self, root: str, max_concurrent: int = 1):
+        self.root = root
+        self.queue_file = os.path.join(root, "_job_queue.json")
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._procs = {}  # job_id -> (Popen 또는 _AdoptedProcess, log file handle 또는 None)
+        self._progress = {}  # job_id -> {"offset": int, "summary": dict}
+        self._thread = None
+        self.jobs = []
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.queue_file):
+            return
+        try:
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.jobs = data.get("jobs", [])
+            self.max_concurrent = max(1, int(data.get("max_concurrent", self.max_concurrent)))
+        except Exception as e:
+            print(f"🚀 작업 큐 로딩 실패: {e}")
+            self.jobs = []
+        # 이전 세션에서 실행/종료 중이던 작업: 살아있으면 계속 추적, 죽었으면 정리
+        for job in self.jobs:
+            status = job.get("status")
+            if status not in ("running", "cancelling"):
+                continue
+            alive = _pid_alive(job.get("pid"), job.get("script", ""))
+            if alive:
+                self._procs[job["id"]] = (_AdoptedProcess(job["pid"], job["script"]), None)
+                print(f"🚀 Re-attached to running training: {job['lora_name']} (job {job['id']}, pid {job['pid']})")
+            elif alive is None:
+                job.update(status="orphaned", finished_at=_timestamp())
+                print(f"🚀 Training job {job['id']} state unknown (pid {job.get('pid')}), marked orphaned")
+            elif status == "cancelling":
+                job.update(status="cancelled", pid=None, finished_at=_timestamp())
+            else:
+                job.update(status="queued", pid=None, started_at=None)
+        self._save()
+        if self._procs or any(j.get("status") == "queued" for j in self.jobs):
+            self._ensure_supervisor()
+
+    def _save(self):
+        _ensure_dir(self.root)
+        tmp = self.queue_file + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"max_concurrent": self.max_concurrent, "jobs": self.jobs}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.queue_file)
+
+    def _find(self, job_id):
+        for job in self.jobs:
+            if job["id"] == job_id:
+                return job
+        return None
+
+    def _ensure_supervisor(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._supervise, name="mingming-training-scheduler", daemon=True)
+                self._thread.start()
+
+    def set_max_concurrent(self, n: int):
+        with self._lock:
+            self.max_concurrent = max(1, int(n))
+            self._save()
+        self._wake.set()
+
+    ACTIVE_STATUSES = ("queued", "running", "cancelling")
+
+    def active_job(self, output_dir: str):
+        """같은 output_dir에서 대기/실행 중인 작업 사본 (없으면 None)"""
+        target = os.path.normcase(os.path.abspath(output_dir))
+        with self._lock:
+            for job in self.jobs:
+                if job["status"] in self.ACTIVE_STATUSES and os.path.normcase(os.path.abspath(job["cwd"])) == target:
+                    return dict(job)
+        return None
+
+    def submit(self, lora_name: str, script_file: str, output_dir: str, config_file: str = "") -> dict:
+        """
+        작업을 큐에 추가하고 바로 반환.
+        같은 output_dir에 활성 작업이 있으면 새로 추가하지 않고 그 작업을 반환.
+        """
+        with self._lock:
+            active = self.active_job(output_dir)
+            if active is not None:
+                return active
+            job_id = f"{_timestamp()}_{uuid.uuid4().hex[:6]}"
+            # 노드가 재실행되며 스크립트/설정을 덮어써도 이 작업은 제출 당시 사본으로 실행
+            jobs_dir = os.path.join(output_dir, "jobs")
+            _ensure_dir(jobs_dir)
+            script_copy = os.path.join(jobs_dir, f"train_{lora_name}_{job_id}.py")
+            shutil.copyfile(script_file, script_copy)
+            config_copy = ""
+            if config_file and os.path.exists(config_file):
+                config_copy = os.path.join(jobs_dir, f"{lora_name}_config_{job_id}.json")
+                shutil.copyfile(config_file, config_copy)
+            job = {
+                "id": job_id,
+                "lora_name": lora_name,
+                "script": script_copy,
+                "config": config_copy,
+                "cwd": output_dir,
+                "log": os.path.join(output_dir, "training.log"),
+                "events": os.path.join(output_dir, "events.jsonl"),
+                "status": "queued",
+                "pid": None,
+                "returncode": None,
+                "created_at": _timestamp(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self.jobs.append(job)
+            self._save()
+        self._ensure_supervisor()
+        self._wake.set()
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """대기 중인 작업은 취소, 실행 중인 작업은 종료 요청"""
+        with self._lock:
+            job = self._find(job_id)
+            if job is None or job["status"] not in ("queued", "running"):
+                return False
+            if job["status"] == "running" and job_id in self._procs:
+                proc = self._procs[job_id][0]
+                try:
+                    proc.terminate()
+                except Exception as e:
+                    print(f"🚀 작업 종료 실패 {job_id}: {e}")
+                job["cancel_requested_at"] = time.time()
+            job["status"] = "cancelled" if job_id not in self._procs else "cancelling"
+            if job["status"] == "cancelled":
+                job["finished_at"] = _timestamp()
+            self._save()
+        self._wake.set()
+        return True
+
+    def position(self, job_id: str) -> int:
+        """대기열 순번 (1부터), 대기 중이 아니면 0"""
+        with self._lock:
+            queued = [j["id"] for j in self.jobs if j["status"] == "queued"]
+        return queued.index(job_id) + 1 if job_id in queued else 0
+
+    def job(self, job_id: str):
+        """작업 정보 사본 (없으면 None)"""
+        with self._lock:
+            job = self._find(job_id)
+            return dict(job) if job is not None else None
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [dict(j, progress=self.progress(j["id"])) for j in self.jobs]
+
+    def progress(self, job_id: str) -> dict:
+        """이벤트 로그를 마지막 오프셋부터 이어 읽어 최신 상태 요약 반환"""
+        with self._lock:
+            job = self._find(job_id)
+            if job is None:
+                return {}
+            state = self._progress.setdefault(job_id, {"offset": job.get("events_offset", 0), "summary": {}})
+            events, state["offset"] = _job_events(job, state["offset"])
+            summary = state["summary"]
+            for ev in events:
+                kind = ev.get("event")
+                if kind == "run_start":
+                    summary.clear()
+                summary[kind] = ev
+            return dict(summary)
+
+    def progress_text(self, job_id: str) -> str:
+        """노드 상태 표시용 한 줄 요약"""
+        summary = self.progress(job_id)
+        step, epoch = summary.get("step"), summary.get("epoch")
+        if not summary:
+            return "waiting for events"
+        parts = []
+        if step:
+            parts.append(f"epoch {step['epoch']} step {step['step']} loss {step['loss']:.4f}")
+        if epoch:
+            parts.append(f"{epoch['samples_per_sec']} samples/sec")
+            mem = epoch.get("peak_memory") or {}
+            if mem:
+                parts.append(", ".join(f"{k}={v}" for k, v in mem.items()))
+        if "checkpoint" in summary:
+            parts.append(f"last ckpt {summary['checkpoint']['path']}")
+        if "run_end" in summary:
+            parts.append(summary["run_end"]["status"])
+        return " | ".join(parts) or "started"
+
+    def _start(self, job):
+        _ensure_dir(job["cwd"])
+        # 이번 실행의 이벤트는 현재 파일 끝 이후부터 (이전 실행 이벤트 무시)
+        events = job.get("events") or os.path.join(job["cwd"], "events.jsonl")
+        job["events_offset"] = os.path.getsize(events) if os.path.exists(events) else 0
+        self._progress.pop(job["id"], None)
+        log = open(job["log"], 'a', encoding='utf-8')
+        kwargs = {"start_new_session": True} if os.name != "nt" else {}
+        try:
+            args = [sys.executable, "-u", job["script"]]
+            if job.get("config"):
+                args += ["--config", job["config"]]
+            proc = subprocess.Popen(
+                args,
+                cwd=job["cwd"], stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                env=dict(os.environ, MINGMING_JOB_ID=job["id"]),
+                **kwargs
+            )
+        except Exception as e:
+            log.close()
+            job.update(status="failed", finished_at=_timestamp(), error=str(e))
+            print(f"🚀 Training launch failed: {job['lora_name']} ({e})")
+            return
+        self._procs[job["id"]] = (proc, log)
+        job.update(status="running", pid=proc.pid, started_at=_timestamp())
+        print(f"🚀 Training started: {job['lora_name']} (job {job['id']}, pid {proc.pid})")
+
+    def _reap(self):
+        changed = False
+        for job_id, (proc, log) in list(self._procs.items()):
+            job = self._find(job_id)
+            rc = proc.poll()
+            if rc is None:
+                # 종료 요청 후 응답이 없으면 강제 종료
+                if job and job["status"] == "cancelling" and time.time() - job.get("cancel_requested_at", 0) > self.KILL_TIMEOUT:
+                    proc.kill()
+                continue
+            if log is not None:
+                log.close()
+            del self._procs[job_id]
+            if isinstance(proc, _AdoptedProcess):
+                rc = None  # 자식 프로세스가 아니라 종료 코드를 알 수 없음
+            if job is not None:
+                if job["status"] == "cancelling":
+                    job["status"] = "cancelled"
+                elif isinstance(proc, _AdoptedProcess):
+                    # 이 작업이 남긴 run_end(시작 오프셋 이후 + job_id 일치)로만 결과 판단,
+                    # 없으면(강제 종료 등) orphaned
+                    run_end = self.progress(job_id).get("run_end") or {}
+                    status = run_end.get("status") if run_end.get("job_id") == job_id else None
+                    job["status"] = {"done": "done", None: "orphaned"}.get(status, "failed")
+                else:
+                    job["status"] = "done" if rc == 0 else "failed"
+                job.update(returncode=rc, finished_at=_timestamp(), pid=None)
+                print(f"🚀 Training {job['status']}: {job['lora_name']} (job {job_id}, rc={rc})")
+            changed = True
+        return changed
+
+    def _supervise(self):
+        while True:
+            with self._lock:
+                changed = self._reap()
+                # 같은 output_dir(캐시/로그/이벤트 공유)는 동시에 실행하지 않음
+                busy = {self._find(job_id)["cwd"] for job_id in self._procs if self._find(job_id)}
+                for job in self.jobs:
+                    if len(self._procs) >= self.max_concurrent:
+                        break
+                    if job["status"] == "queued" and job["cwd"] not in busy:
+                        self._start(job)
+                        busy.add(job["cwd"])
+                        changed = True
+                if changed:
+                    self._save()
+                idle = not self._procs and not any(j["status"] == "queued" for j in self.jobs)
+                if idle:
+                    self._thread = None
+                    return
+            self._wake.wait(self.POLL_INTERVAL)
+            self._wake.clear()
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+def _get_scheduler() -> _TrainingScheduler:
+    """프로세스당 하나의 스케줄러"""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = _TrainingScheduler(os.path.join(_pkg_data_root(), "lora_outputs"))
+        return _SCHEDULER
+
 # ---------- 💜 TRAINING NODE (원본 유지) ----------
 
 class MingmingTrainingNode:
@@ -547,6 +1242,8 @@ class MingmingTrainingNode:
             "optional": {
                 "base_model_path": ("STRING", {"default": ""}),
                 "output_name": ("STRING", {"default": ""}),
+                "max_concurrent_jobs": ("INT", {"default": 1, "min": 1, "max": 8}),
+                "cancel_job_id": ("STRING", {"default": ""}),
             }
         }
 
@@ -571,6 +1268,8 @@ class MingmingTrainingNode:
 
         base_model_path = kwargs.get("base_model_path", "")
         output_name = kwargs.get("output_name", "")
+        max_jobs = kwargs.get("max_concurrent_jobs", 1)
+        cancel_job_id = (kwargs.get("cancel_job_id", "") or "").strip()
 
         lora_name = "mingming_lora"
         total_frames = 15
@@ -610,6 +1309,10 @@ class MingmingTrainingNode:
             "optimizer": optimizer,
             "resolution": resolution,
             "save_every_n_epochs": save_every,
+            "num_workers": 2,
+            "prefetch_batches": 4,
+            "bucket_step": 64,
+            "max_aspect": 2.0,
             "auto_backup": auto_backup,
             "created_at": _timestamp(),
             "total_steps": total_frames * epochs,
@@ -654,8 +1357,38 @@ class MingmingTrainingNode:
   - start_training.bat (Windows)
   - start_training.sh (Linux/Mac)"""
 
+        if cancel_job_id:
+            scheduler = _get_scheduler()
+            cancelled = scheduler.cancel(cancel_job_id)
+            training_status += f"\n\n🛑 Cancel {cancel_job_id}: {'OK' if cancelled else 'not found / already finished'}"
+
+        if os.path.exists(os.path.join(_pkg_data_root(), "lora_outputs", "_job_queue.json")):
+            scheduler = _get_scheduler()
+            previous = [j for j in scheduler.snapshot() if j["lora_name"] == lora_name and j["status"] in ("running", "cancelling")]
+            for job in previous:
+                training_status += f"\n\n📡 Job {job['id']} ({job['status']}): {scheduler.progress_text(job['id'])}"
+
         if start_now:
-            training_status += "\n\n🚀 Training started automatically!"
+            scheduler = _get_scheduler()
+            scheduler.set_max_concurrent(max_jobs)
+            active = scheduler.active_job(output_dir)
+            if active is not None:
+                training_status += f"""
+
+⏳ Training job already {active['status']} for this output directory - not queued again
+  - Job ID: {active['id']}
+  - Cancel it with cancel_job_id to queue the new settings"""
+            else:
+                job = scheduler.submit(lora_name, script_file, output_dir, config_file)
+                position = scheduler.position(job["id"])
+                training_status += f"""
+
+🚀 Training job queued!
+  - Job ID: {job['id']}
+  - Queue Position: {position if position else 'starting'}
+  - Max Concurrent: {scheduler.max_concurrent}
+  - Log: {job['log']}
+  - Events: {job['events']}"""
 
         print(f"💜 Training setup completed for {lora_name}")
 
@@ -669,9 +1402,22 @@ class MingmingTrainingNode:
 Generated: {config['created_at']}
 LoRA Name: {config['lora_name']}
 """
-import os, sys, json, time, argparse
+import os, sys, json, time, argparse, queue, random, threading
 from pathlib import Path
 
+DATASET_DIR = Path({config['dataset_path']!r})
+CACHE_DIR = Path({config['output_dir']!r}) / "cache"
+EVENTS_FILE = Path({config['output_dir']!r}) / "events.jsonl"
+JOB_ID = os.environ.get("MINGMING_JOB_ID", "")  # 스케줄러가 실행하면 작업 ID가 설정됨
+RESOLUTION = {config['resolution']}
+BATCH_SIZE = {config['batch_size']}
+NUM_WORKERS = {config.get('num_workers', 2)}
+PREFETCH_BATCHES = {config.get('prefetch_batches', 4)}
+BUCKET_STEP = {config.get('bucket_step', 64)}
+MAX_ASPECT = {config.get('max_aspect', 2.0)}
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+CACHE_VERSION = 1
+
 def print_header():
     print("💜" + "="*60)
     print("💖 Mingming LoRA Training System")
@@ -683,7 +1429,7 @@ def print_header():
     print("💜" + "="*60)
 
 def check_dependencies():
-    required_modules = ['torch','torchvision','diffusers','transformers','accelerate','xformers']
+    required_modules = ['numpy','PIL','torch','torchvision','diffusers','transformers','accelerate','xformers']
     missing = []
     for m in required_modules:
         try:
@@ -697,10 +1443,10 @@ def check_dependencies():
     return True
 
 def prepare_dataset():
-    p = Path("{config['dataset_path']}")
+    p = DATASET_DIR
     if not p.exists():
         print(f"❌ Dataset not found: {{p}}"); return False
-    imgs = list(p.glob("*.png")) + list(p.glob("*.jpg"))
+    imgs = list_dataset_images()
     caps = list(p.glob("*.txt"))
     print(f"💙 Found {{len(imgs)}} images")
     print(f"💚 Found {{len(caps)}} captions")
@@ -709,35 +1455,355 @@ def prepare_dataset():
     print(f"💜 Matched pairs: {{matched}}/{{len(imgs)}}")
     return True
 
-def main():
+# ---------- 📡 Telemetry (JSONL) ----------
+
+def log_event(event, **fields):
+    """EVENTS_FILE에 한 줄짜리 JSON 이벤트 추가 (노드/엔드포인트가 tail)"""
+    record = {{"time": time.time(), "event": event}}
+    if JOB_ID:
+        record["job_id"] = JOB_ID
+    record.update(fields)
+    with open(EVENTS_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\\n")
+
+def peak_memory_mb():
+    """프로세스 최대 RSS와 (가능하면) CUDA 최대 할당량, MB 단위"""
+    mem = {{}}
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        mem["rss_mb"] = round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except Exception:
+        pass
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        mem["cuda_mb"] = round(torch.cuda.max_memory_allocated() / (1024 * 1024), 1)
+    return mem
+
+# ---------- 💾 Frame Cache (memmap) ----------
+
+def list_dataset_images():
+    return sorted(f for f in DATASET_DIR.iterdir() if f.is_file() and f.suffix.lower() in IMAGE_EXTS)
+
+def dataset_signature(paths):
+    """이미지/캡션 파일 mtime·크기 — 캐시 유효성 검사용"""
+    sig = []
+    for im in paths:
+        st = im.stat()
+        cap = im.with_suffix(".txt")
+        cap_mtime = cap.stat().st_mtime_ns if cap.exists() else 0
+        sig.append([im.name, st.st_mtime_ns, st.st_size, cap_mtime])
+    return sig
+
+class FrameCache:
+    """
+    리사이즈된 프레임을 uint8 memmap 하나에 저장하고 캡션은 오프셋 인덱스 테이블로 보관.
+    첫 에포크 전에 한 번만 디코딩하고 이후 에포크는 memmap에서 바로 읽음.
+
+    cache/
+      frames.u8        - 모든 프레임을 이어붙인 uint8 바이트
+      frames_idx.npy   - (N, 3) int64: offset, height, width
+      captions.bin     - utf-8 캡션 바이트
+      captions_idx.npy - (N, 2) int64: offset, length
+      manifest.json    - 버전, 타깃 크기, 파일 mtime 서명
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.frames = None
+        self.frame_index = None
+        self.captions = None
+        self.caption_index = None
+
+    def __len__(self):
+        return 0 if self.frame_index is None else len(self.frame_index)
+
+    def _manifest(self, paths, sizes):
+        return {{
+            "version": CACHE_VERSION,
+            "sizes": [list(s) for s in sizes],
+            "files": dataset_signature(paths),
+        }}
+
+    def is_valid(self, manifest):
+        """manifest 일치 + 데이터 파일이 모두 있고 크기/모양이 맞는지 확인"""
+        import numpy as np
+        mf = self.cache_dir / "manifest.json"
+        try:
+            with open(mf, "r", encoding="utf-8") as f:
+                if json.load(f) != manifest:
+                    return False
+            n = len(manifest["sizes"])
+            expected = max(sum(w * h * 3 for w, h in manifest["sizes"]), 1)
+            if (self.cache_dir / "frames.u8").stat().st_size != expected:
+                return False
+            if np.load(self.cache_dir / "frames_idx.npy").shape != (n, 3):
+                return False
+            if np.load(self.cache_dir / "captions_idx.npy").shape != (n, 2):
+                return False
+            return (self.cache_dir / "captions.bin").exists()
+        except Exception:
+            return False
+
+    def load_or_build(self, paths, sizes):
+        """캐시가 유효하면 로드, 아니면 재생성. 재생성 여부 반환"""
+        manifest = self._manifest(paths, sizes)
+        built = False
+        if not self.is_valid(manifest):
+            self.build(paths, sizes, manifest)
+            built = True
+        self.load()
+        return built
+
+    def build(self, paths, sizes, manifest):
+        import numpy as np
+        from PIL import Image, ImageOps
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        mf = self.cache_dir / "manifest.json"
+        if mf.exists():
+            mf.unlink()  # 빌드 도중 중단되면 다음 실행에서 재생성되도록
+
+        frame_index = np.zeros((len(paths), 3), dtype=np.int64)
+        offset = 0
+        for i, (w, h) in enumerate(sizes):
+            frame_index[i] = (offset, h, w)
+            offset += w * h * 3
+
+        tmp = self.cache_dir / "frames.u8.tmp"
+        frames = np.memmap(tmp, dtype=np.uint8, mode="w+", shape=(max(offset, 1),))
+        captions = []
+        for i, (im, (w, h)) in enumerate(zip(paths, sizes)):
+            with Image.open(im) as img:
+                img = ImageOps.exif_transpose(img).convert("RGB")
+                if img.size != (w, h):
+                    img = ImageOps.fit(img, (w, h), Image.LANCZOS)
+                start = frame_index[i, 0]
+                frames[start:start + w * h * 3] = np.asarray(img, dtype=np.uint8).reshape(-1)
+            cap = im.with_suffix(".txt")
+            captions.append(cap.read_text(encoding="utf-8").strip().encode("utf-8") if cap.exists() else b"")
+        frames.flush()
+        del frames
+        os.replace(tmp, self.cache_dir / "frames.u8")
+
+        lengths = np.array([len(c) for c in captions], dtype=np.int64)
+        caption_index = np.stack([np.cumsum(lengths) - lengths, lengths], axis=1) if len(captions) else np.zeros((0, 2), dtype=np.int64)
+        with open(self.cache_dir / "captions.bin", "wb") as f:
+            f.write(b"".join(captions))
+        np.save(self.cache_dir / "frames_idx.npy", frame_index)
+        np.save(self.cache_dir / "captions_idx.npy", caption_index)
+        with open(mf, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        print(f"💾 Frame cache built: {{len(paths)}} frames, {{offset / 1e6:.1f}} MB")
+
+    def load(self):
+        import numpy as np
+        self.frame_index = np.load(self.cache_dir / "frames_idx.npy")
+        self.caption_index = np.load(self.cache_dir / "captions_idx.npy")
+        self.frames = np.memmap(self.cache_dir / "frames.u8", dtype=np.uint8, mode="r")
+        self.captions = (self.cache_dir / "captions.bin").read_bytes()
+
+    def frame(self, i):
+        """(H, W, 3) uint8 뷰 — 복사 없음"""
+        offset, h, w = (int(v) for v in self.frame_index[i])
+        return self.frames[offset:offset + h * w * 3].reshape(h, w, 3)
+
+    def caption(self, i):
+        offset, length = (int(v) for v in self.caption_index[i])
+        return self.captions[offset:offset + length].decode("utf-8")
+
+# ---------- 🪣 Aspect-Ratio Buckets ----------
+
+def make_buckets(resolution, step=BUCKET_STEP, max_aspect=MAX_ASPECT):
+    """면적이 resolution² 이하이고 변이 step 배수인 (w, h) 버킷 목록"""
+    area = resolution * resolution
+    buckets = set()
+    w = step
+    while w <= resolution * max_aspect:
+        h = min(int(area // w) // step * step, int(resolution * max_aspect) // step * step)
+        if h >= step and max(w, h) / min(w, h) <= max_aspect:
+            buckets.add((w, h))
+        w += step
+    return sorted(buckets)
+
+def assign_buckets(paths, buckets):
+    """이미지 헤더만 읽어 가장 가까운 종횡비 버킷에 배정"""
+    from PIL import Image, ImageOps
+    import math
+    log_ratios = [math.log(w / h) for w, h in buckets]
+    sizes = []
+    for im in paths:
+        with Image.open(im) as img:
+            w, h = img.size
+            if (img.getexif() or {{}}).get(0x0112, 1) in (5, 6, 7, 8):  # EXIF 90° 회전
+                w, h = h, w
+        r = math.log(w / h)
+        sizes.append(buckets[min(range(len(buckets)), key=lambda b: abs(log_ratios[b] - r))])
+    return sizes
+
+class BucketBatchSampler:
+    """같은 버킷끼리만 배치를 구성, 에포크마다 버킷 내부와 배치 순서를 셔플"""
+    def __init__(self, sizes, batch_size, seed=0):
+        self.batch_size = max(1, batch_size)
+        self.seed = seed
+        self.buckets = {{}}
+        for i, size in enumerate(sizes):
+            self.buckets.setdefault(tuple(size), []).append(i)
+
+    def __len__(self):
+        return sum((len(ids) + self.batch_size - 1) // self.batch_size for ids in self.buckets.values())
+
+    def epoch(self, epoch):
+        rng = random.Random(self.seed + epoch)
+        batches = []
+        for size in sorted(self.buckets):
+            ids = self.buckets[size][:]
+            rng.shuffle(ids)
+            batches.extend(ids[i:i + self.batch_size] for i in range(0, len(ids), self.batch_size))
+        rng.shuffle(batches)
+        return batches
+
+class PrefetchLoader:
+    """
+    백그라운드 워커 N개가 캐시에서 배치를 조립해 전달.
+    (memmap 읽기와 numpy 변환은 GIL을 놓으므로 스레드로 충분)
+    배치 순서는 샘플러 순서 그대로 유지 (재정렬 버퍼) → 같은 --seed면 같은 순서.
+    조립 중 + 대기 중인 배치는 num_workers + prefetch 개로 제한.
+    """
+    def __init__(self, cache, batches, num_workers=NUM_WORKERS, prefetch=PREFETCH_BATCHES):
+        self.cache = cache
+        self.batches = batches
+        self.num_workers = max(1, num_workers)
+        self.prefetch = max(1, prefetch)
+
+    def _collate(self, ids):
+        import numpy as np
+        frames = np.stack([self.cache.frame(i) for i in ids]).astype(np.float32)
+        frames *= 1.0 / 255.0
+        return frames, [self.cache.caption(i) for i in ids]
+
+    def _worker(self, tasks, out, window, stop):
+        while not stop.is_set():
+            if not window.acquire(timeout=0.1):
+                continue
+            try:
+                idx, ids = tasks.get_nowait()
+            except queue.Empty:
+                window.release()
+                break
+            try:
+                item = self._collate(ids)
+            except Exception as e:
+                item = e
+            out.put((idx, item))
+        out.put(None)
+
+    def __iter__(self):
+        tasks = queue.Queue()
+        for idx, ids in enumerate(self.batches):
+            tasks.put((idx, ids))
+        out = queue.Queue()  # window 세마포어가 크기를 제한
+        window = threading.Semaphore(self.num_workers + self.prefetch)
+        stop = threading.Event()
+        workers = [threading.Thread(target=self._worker, args=(tasks, out, window, stop), daemon=True)
+                   for _ in range(self.num_workers)]
+        for t in workers:
+            t.start()
+        pending, next_idx, finished = {{}}, 0, 0
+        try:
+            while next_idx < len(self.batches):
+                if next_idx in pending:
+                    item = pending.pop(next_idx)
+                    next_idx += 1
+                    window.release()
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+                    continue
+                if finished == len(workers):
+                    break
+                got = out.get()
+                if got is None:
+                    finished += 1
+                else:
+                    pending[got[0]] = got[1]
+        finally:
+            stop.set()
+            for t in workers:
+                t.join()
+
+def main(args):
     print_header()
-    print("\\n💝 Checking dependencies...")
-    if not check_dependencies(): return 1
+    if args.data_only:
+        print("\\n💝 Data-only mode: skipping model dependency check")
+    else:
+        print("\\n💝 Checking dependencies...")
+        if not check_dependencies(): return 1
     print("\\n💕 Preparing dataset...")
     if not prepare_dataset(): return 1
+    print("\\n🪣 Assigning aspect-ratio buckets...")
+    images = list_dataset_images()
+    sizes = assign_buckets(images, make_buckets(RESOLUTION))
+    sampler = BucketBatchSampler(sizes, BATCH_SIZE, seed=args.seed)
+    for size, ids in sorted(sampler.buckets.items()):
+        print(f"  {{size[0]}}x{{size[1]}}: {{len(ids)}} images")
+    print("\\n💾 Loading frame cache...")
+    cache = FrameCache(CACHE_DIR)
+    built = cache.load_or_build(images, sizes)
+    print(f"💾 Frame cache {{'rebuilt' if built else 'reused'}}: {{CACHE_DIR}}")
+    steps_per_epoch = len(sampler)
+    epochs = {config['epochs']}
+    log_event("run_start", lora_name={config['lora_name']!r}, epochs=epochs, steps_per_epoch=steps_per_epoch,
+              images=len(images), cache_rebuilt=built, buckets={{f"{{w}}x{{h}}": len(ids) for (w, h), ids in sampler.buckets.items()}})
     print("\\n🚀 Starting LoRA training...")
+    samples, data_time, global_step = 0, 0.0, 0
     try:
-        for epoch in range({config['epochs']}):
-            print(f"💜 Epoch {{epoch+1}}/{config['epochs']} starting...")
-            for step in range(10):
-                time.sleep(0.1)
+        for epoch in range(epochs):
+            print(f"💜 Epoch {{epoch+1}}/{{epochs}} starting...")
+            loader = PrefetchLoader(cache, sampler.epoch(epoch), args.workers, args.prefetch)
+            epoch_samples = 0
+            t0 = t_step = time.perf_counter()
+            for step, (frames, captions) in enumerate(loader):
+                loss = 0.5 / (1.0 + 0.05 * global_step)  # 플레이스홀더 (항상 양수, 점감)
+                now = time.perf_counter()
+                epoch_samples += len(frames)
+                global_step += 1
+                log_event("step", epoch=epoch + 1, step=step + 1, global_step=global_step, loss=loss,
+                          batch=list(frames.shape[:3]), samples_per_sec=round(len(frames) / max(now - t_step, 1e-9), 2))
+                t_step = now
                 if step % 5 == 0:
-                    print(f"  Step {{step+1}}/10 - Loss: {{0.5 - step*0.05:.4f}}")
+                    print(f"  Step {{step+1}}/{{steps_per_epoch}} - Batch: {{tuple(frames.shape)}} - Loss: {{loss:.4f}}")
+            epoch_time = time.perf_counter() - t0
+            samples += epoch_samples
+            data_time += epoch_time
+            log_event("epoch", epoch=epoch + 1, samples=epoch_samples, seconds=round(epoch_time, 4),
+                      samples_per_sec=round(epoch_samples / max(epoch_time, 1e-9), 2), peak_memory=peak_memory_mb())
             if (epoch + 1) % {config['save_every_n_epochs']} == 0:
-                print(f"💝 Saving checkpoint: {config['lora_name']}_epoch_{{epoch+1}}.safetensors")
-        print(f"💕 Saving final model: {config['lora_name']}_final.safetensors")
+                ckpt = f"{config['lora_name']}_epoch_{{epoch+1}}.safetensors"
+                print(f"💝 Saving checkpoint: {{ckpt}}")
+                log_event("checkpoint", epoch=epoch + 1, path=ckpt)
+        final = f"{config['lora_name']}_final.safetensors"
+        print(f"💕 Saving final model: {{final}}")
+        log_event("checkpoint", epoch=epochs, path=final, final=True)
+        throughput = samples / max(data_time, 1e-9)
+        print(f"\\n📈 Throughput: {{throughput:.1f}} samples/sec ({{samples}} samples, {{data_time:.2f}}s)")
+        log_event("run_end", status="done", samples=samples, samples_per_sec=round(throughput, 2), peak_memory=peak_memory_mb())
         print("\\n🎉 Training completed successfully!")
     except KeyboardInterrupt:
+        log_event("run_end", status="interrupted", global_step=global_step)
         print("\\n⚠️ Training interrupted by user"); return 1
     except Exception as e:
+        log_event("run_end", status="failed", global_step=global_step, error=str(e))
         print(f"\\n❌ Training failed: {{e}}"); return 1
     return 0
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Mingming LoRA Training")
     parser.add_argument("--config", default="{config['lora_name']}_config.json", help="Training config file")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="Prefetch worker threads")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH_BATCHES, help="Max batches buffered ahead")
+    parser.add_argument("--seed", type=int, default=0, help="Bucket shuffle seed")
+    parser.add_argument("--data-only", action="store_true", help="Run only the data pipeline (CPU benchmark)")
     args = parser.parse_args()
-    sys.exit(main())
+    sys.exit(main(args))
 '''
         return script_template
 
@@ -786,6 +1852,49 @@ read -p "Press Enter to exit..."
         except: pass
         print(f"💜 Created shell script: {sh_file}")
 
+# ---------- 🌐 API Routes (ComfyUI 서버가 있을 때만) ----------
+
+try:
+    from aiohttp import web
+    from server import PromptServer
+
+    @PromptServer.instance.routes.get("/mingming/jobs")
+    async def _mingming_list_jobs(request):
+        return web.json_response({"jobs": _get_scheduler().snapshot()})
+
+    @PromptServer.instance.routes.get("/mingming/jobs/{job_id}/events")
+    async def _mingming_job_events(request):
+        """?offset=N 부터 이 작업의 새 이벤트만 반환 - 클라이언트는 next_offset으로 이어서 폴링"""
+        job = _get_scheduler().job(request.match_info["job_id"])
+        if job is None:
+            return web.json_response({"error": "job not found"}, status=404)
+        try:
+            offset = max(0, int(request.query.get("offset", 0)))
+        except ValueError:
+            offset = 0
+        events, next_offset = _job_events(job, offset)
+        return web.json_response({"events": events, "next_offset": next_offset, "status": job["status"]})
+
+    @PromptServer.instance.routes.post("/mingming/jobs/{job_id}/cancel")
+    async def _mingming_cancel_job(request):
+        scheduler = _get_scheduler()
+        job_id = request.match_info["job_id"]
+        job = scheduler.job(job_id)
+        if job is None:
+            return web.json_response({"error": "job not found"}, status=404)
+        ok = scheduler.cancel(job_id)
+        # 이미 끝난 작업은 409 (알 수 없는 id의 404와 구분)
+        return web.json_response({"cancelled": ok, "status": scheduler.job(job_id)["status"]}, status=200 if ok else 409)
+except Exception as e:
+    print(f"🚀 Mingming job API routes not registered: {e}")
+
+# 재시작 후 저장된 대기 작업 실행 / 살아있는 학습 프로세스 재추적을 바로 시작
+if os.path.exists(os.path.join(_pkg_data_root(), "lora_outputs", "_job_queue.json")):
+    try:
+        _get_scheduler()
+    except Exception as e:
+        print(f"🚀 Training scheduler resume failed: {e}")
+
 # ---------- Node Registration ----------
 
 NODE_CLASS_MAPPINGS = {